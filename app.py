@@ -1,13 +1,19 @@
+import io
 import os
-import json
+import re
+import time
 import uuid
+import hashlib
+import functools
 import tempfile
-from datetime import datetime
-from typing import Tuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Optional, Tuple
 
 import shutil
 from pathlib import Path
 
+import msgspec
 import gradio as gr
 import google.generativeai as genai
 from reportlab.lib.pagesizes import letter
@@ -22,9 +28,116 @@ load_dotenv()
 # Configure Gemini API
 genai.configure(api_key=os.getenv('GEMINI_API_KEY'))
 
+# Section headers expected in the Gemini report (matched case-insensitively)
+_SECTIONS_RE = re.compile(r'\b(SUMMARY|FINDINGS|RECOMMENDATIONS)\b', re.IGNORECASE)
+
+# PDF styles – built once, shared (read-only) by every report
+_STYLES = getSampleStyleSheet()
+
+_TITLE_STYLE = ParagraphStyle(
+    'CustomTitle',
+    parent=_STYLES['Heading1'],
+    fontSize=24,
+    spaceAfter=30,
+    textColor='darkblue'
+)
+
+_HEADING_STYLE = ParagraphStyle(
+    'CustomHeading',
+    parent=_STYLES['Heading2'],
+    fontSize=16,
+    spaceAfter=12,
+    textColor='darkred'
+)
+
+# Fixed shape of the per-scan JSON report
+class ReportOut(msgspec.Struct):
+    report_id: uuid.UUID
+    date: date
+    summary: str
+    findings: str
+    recommendations: str
+
+_REPORT_ENCODER = msgspec.json.Encoder()
+
+def _env_seconds(name: str, default: int) -> int:
+    """
+    Reads a non-negative number of seconds from the environment, falling back
+    to the default (with a warning) instead of failing at import time.
+    """
+    value = os.getenv(name, '').strip()
+    if not value:
+        return default
+    try:
+        seconds = int(value)
+        if seconds < 0:
+            raise ValueError(value)
+        return seconds
+    except ValueError:
+        print(f"⚠️ Ignoring invalid {name}={value!r}; using {default}s")
+        return default
+
+# On-disk cache of Gemini responses, keyed by the SHA-256 of the prompt.
+# Lives in the user's own cache dir (not a shared /tmp path others could seed)
+GEMINI_CACHE_DIR = Path(os.getenv('XDG_CACHE_HOME') or Path.home() / '.cache') / "gemini_cache"
+GEMINI_CACHE_TTL = _env_seconds('GEMINI_CACHE_TTL', 3600)
+
+@functools.lru_cache(maxsize=1)
+def _get_model() -> genai.GenerativeModel:
+    """
+    Returns the shared Gemini model, created on first use rather than at import.
+    """
+    return genai.GenerativeModel('gemini-2.5-flash')
+
+def _is_private(st: os.stat_result) -> bool:
+    """
+    True if the path is owned by the current user and not group/world-writable.
+    """
+    if not hasattr(os, 'getuid'):
+        return True  # Windows: the cache sits in the per-user profile already
+    return st.st_uid == os.getuid() and not st.st_mode & 0o022
+
+def _read_cached_response(cache_file: Path) -> Optional[str]:
+    """
+    Returns the cached response text, or None if missing, older than the TTL,
+    or not privately owned by the current user.
+    """
+    try:
+        st = cache_file.stat()
+        if not (_is_private(GEMINI_CACHE_DIR.stat()) and _is_private(st)):
+            return None
+        if time.time() - st.st_mtime > GEMINI_CACHE_TTL:
+            return None
+        return cache_file.read_text(encoding="utf-8")
+    except OSError:
+        return None
+
+def _write_cached_response(cache_file: Path, text: str) -> None:
+    """
+    Atomically stores a response so concurrent readers never see a partial file.
+    """
+    try:
+        GEMINI_CACHE_DIR.mkdir(mode=0o700, parents=True, exist_ok=True)
+        if not _is_private(GEMINI_CACHE_DIR.stat()):
+            print(f"⚠️ Not caching Gemini response: {GEMINI_CACHE_DIR} is not private")
+            return
+        fd, tmp_name = tempfile.mkstemp(dir=GEMINI_CACHE_DIR, suffix='.tmp')
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(text)
+            os.replace(tmp_name, cache_file)
+        except BaseException:
+            # Don't leave half-written .tmp files behind in the cache
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+    except OSError as e:
+        # A failed cache write should never fail the scan itself
+        print(f"⚠️ Could not cache Gemini response: {e}")
+
 def call_gemini_api(prompt: str) -> str:
     """
     Calls the Google Gemini API with a static prompt to generate a mock scan report.
+    Successful responses are cached on disk for GEMINI_CACHE_TTL seconds.
     
     Args:
         prompt: The prompt to send to Gemini
@@ -32,13 +145,17 @@ def call_gemini_api(prompt: str) -> str:
     Returns:
         Generated text response from Gemini
     """
+    # Serve repeat prompts from the cache instead of a network round-trip
+    cache_file = GEMINI_CACHE_DIR / f"{hashlib.sha256(prompt.encode('utf-8')).hexdigest()}.txt"
+    cached = _read_cached_response(cache_file)
+    if cached is not None:
+        return cached
+    
     try:
-        # Initialize the Gemini model
-        model = genai.GenerativeModel('gemini-2.5-flash')
-        
-        # Generate content
-        response = model.generate_content(prompt)
+        # Generate content with the shared model instance
+        response = _get_model().generate_content(prompt)
         
+        _write_cached_response(cache_file, response.text)
         return response.text
     except Exception as e:
         # Return a fallback response if API call fails
@@ -65,29 +182,33 @@ def parse_report_sections(report_text: str) -> dict:
     Returns:
         Dictionary with parsed sections
     """
-    # Convert to uppercase for consistent parsing
-    text_upper = report_text.upper()
+    # Find section boundaries (first occurrence of each header) in one pass
+    headers = {}
+    for match in _SECTIONS_RE.finditer(report_text):
+        headers.setdefault(match.group(1).upper(), match)
+        if len(headers) == 3:
+            break
     
-    # Find section boundaries
-    summary_start = text_upper.find('SUMMARY')
-    findings_start = text_upper.find('FINDINGS')
-    recommendations_start = text_upper.find('RECOMMENDATIONS')
+    # Each section runs from its header to the next header (or the end)
+    matches = list(headers.values())
+    spans = {
+        m.group(1).upper(): (m.end(), next_m.start() if next_m else len(report_text))
+        for m, next_m in zip(matches, matches[1:] + [None])
+    }
     
     # Extract sections with fallback handling
-    if summary_start != -1:
-        summary_end = findings_start if findings_start != -1 else len(report_text)
-        summary = report_text[summary_start + 7:summary_end].strip()
+    if 'SUMMARY' in spans:
+        summary = report_text[slice(*spans['SUMMARY'])].strip()
     else:
         summary = "No summary section found in the generated report."
     
-    if findings_start != -1:
-        findings_end = recommendations_start if recommendations_start != -1 else len(report_text)
-        findings = report_text[findings_start + 8:findings_end].strip()
+    if 'FINDINGS' in spans:
+        findings = report_text[slice(*spans['FINDINGS'])].strip()
     else:
         findings = "No findings section found in the generated report."
     
-    if recommendations_start != -1:
-        recommendations = report_text[recommendations_start + 13:].strip()
+    if 'RECOMMENDATIONS' in spans:
+        recommendations = report_text[slice(*spans['RECOMMENDATIONS'])].strip()
     else:
         recommendations = "No recommendations section found in the generated report."
     
@@ -97,95 +218,102 @@ def parse_report_sections(report_text: str) -> dict:
         'recommendations': recommendations
     }
 
-def create_pdf_report(report_data: dict) -> str:
+def create_pdf_report(report_data: dict, when: Optional[datetime] = None) -> str:
     """
     Creates a PDF report from the parsed report data and saves it to a temporary file.
     
     Args:
         report_data: Dictionary containing report sections
+        when: Report timestamp (defaults to now)
     
     Returns:
         Path to the temporary PDF file
     """
-    # Create a temporary file
-    temp_file = tempfile.NamedTemporaryFile(delete=False, suffix='.pdf')
-    temp_file.close()
+    # Render into memory; the file is written once at the end
+    buffer = io.BytesIO()
     
     # Create the PDF document
-    doc = SimpleDocTemplate(temp_file.name, pagesize=letter)
-    styles = getSampleStyleSheet()
-    
-    # Custom styles
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=24,
-        spaceAfter=30,
-        textColor='darkblue'
-    )
-    
-    heading_style = ParagraphStyle(
-        'CustomHeading',
-        parent=styles['Heading2'],
-        fontSize=16,
-        spaceAfter=12,
-        textColor='darkred'
-    )
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
     
     # Build the PDF content
     story = []
     
     # Title
-    story.append(Paragraph("Mock Security Scan Report", title_style))
+    story.append(Paragraph("Mock Security Scan Report", _TITLE_STYLE))
     story.append(Spacer(1, 20))
     
     # Date
-    current_date = datetime.now().strftime("%Y-%m-%d")
-    story.append(Paragraph(f"<b>Date:</b> {current_date}", styles['Normal']))
+    current_date = (when or datetime.now()).isoformat(timespec="seconds")
+    story.append(Paragraph(f"<b>Date:</b> {current_date}", _STYLES['Normal']))
     story.append(Spacer(1, 20))
     
     # Summary section
-    story.append(Paragraph("SUMMARY", heading_style))
-    story.append(Paragraph(report_data['summary'], styles['Normal']))
+    story.append(Paragraph("SUMMARY", _HEADING_STYLE))
+    story.append(Paragraph(report_data['summary'], _STYLES['Normal']))
     story.append(Spacer(1, 20))
     
     # Findings section
-    story.append(Paragraph("FINDINGS", heading_style))
-    story.append(Paragraph(report_data['findings'], styles['Normal']))
+    story.append(Paragraph("FINDINGS", _HEADING_STYLE))
+    story.append(Paragraph(report_data['findings'], _STYLES['Normal']))
     story.append(Spacer(1, 20))
     
     # Recommendations section
-    story.append(Paragraph("RECOMMENDATIONS", heading_style))
-    story.append(Paragraph(report_data['recommendations'], styles['Normal']))
+    story.append(Paragraph("RECOMMENDATIONS", _HEADING_STYLE))
+    story.append(Paragraph(report_data['recommendations'], _STYLES['Normal']))
     
     # Build the PDF
     doc.build(story)
     
-    return temp_file.name
+    # Write it to a temporary file in a single pass
+    fd, pdf_path = tempfile.mkstemp(suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(buffer.getvalue())
+    
+    return pdf_path
+
+def create_json_report(report_data: dict, when: Optional[datetime] = None) -> str:
+    when = when or datetime.now()
 
-def create_json_report(report_data: dict) -> str:
     # Where you want finished files to live
     SHARED_DIR = Path("./scan_outputs")
     SHARED_DIR.mkdir(exist_ok=True)
 
     # Build JSON payload
-    json_data = {
-        "report_id": str(uuid.uuid4()),
-        "date": datetime.now().strftime("%Y-%m-%d"),
-        "summary": report_data['summary'],
-        "findings": report_data['findings'],
-        "recommendations": report_data['recommendations']
-    }
+    report = ReportOut(
+        report_id=uuid.uuid4(),
+        date=when.date(),
+        summary=report_data['summary'],
+        findings=report_data['findings'],
+        recommendations=report_data['recommendations']
+    )
 
     # Final destination path
-    json_dest = SHARED_DIR / f"{datetime.now():%Y%m%dT%H%M%S}.json"
+    json_dest = SHARED_DIR / f"{when:%Y%m%dT%H%M%S}.json"
 
-    # Write directly to the destination (no temp file needed)
-    with open(json_dest, "w", encoding="utf-8") as f:
-        json.dump(json_data, f, indent=2, ensure_ascii=False)
+    # Write directly to the destination (no temp file needed); the struct
+    # encoder serialises the UUID and date natively and always emits UTF-8
+    json_dest.write_bytes(msgspec.json.format(_REPORT_ENCODER.encode(report), indent=2))
 
     return str(json_dest) 
 
+def create_reports(report_data: dict, when: Optional[datetime] = None) -> Tuple[str, str]:
+    """
+    Builds the PDF and JSON reports in parallel; the CPU-heavy ReportLab build
+    overlaps with the JSON write. Both files share one timestamp.
+    
+    Args:
+        report_data: Dictionary containing report sections
+        when: Report timestamp (defaults to now)
+    
+    Returns:
+        Tuple of (pdf_file_path, json_file_path)
+    """
+    when = when or datetime.now()
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        pdf_future = executor.submit(create_pdf_report, report_data, when)
+        json_future = executor.submit(create_json_report, report_data, when)
+        return pdf_future.result(), json_future.result()
+
 def run_scan() -> Tuple[str, str]:
     """
     Main function that orchestrates the scan process:
@@ -207,6 +335,9 @@ def run_scan() -> Tuple[str, str]:
     
     Make it realistic but clearly indicate it's a mock/test report. Include technical details like CVE numbers, ports, and specific vulnerability types."""
     
+    # One timestamp shared by the PDF and JSON reports
+    scan_time = datetime.now()
+    
     try:
         print("🔄 Starting scan...")
         
@@ -219,14 +350,10 @@ def run_scan() -> Tuple[str, str]:
         print("📝 Parsing report sections...")
         report_data = parse_report_sections(report_text)
         
-        # Step 3: Create PDF report
-        print("📄 Creating PDF report...")
-        pdf_path = create_pdf_report(report_data)
+        # Steps 3 & 4: Create PDF and JSON reports concurrently
+        print("📄 Creating PDF and 📊 JSON reports...")
+        pdf_path, json_path = create_reports(report_data, scan_time)
         print(f"✅ PDF created: {pdf_path}")
-        
-        # Step 4: Create JSON report  
-        print("📊 Creating JSON report...")
-        json_path = create_json_report(report_data)
         print(f"✅ JSON created: {json_path}")
         
         print("🎉 Scan completed successfully!")
@@ -244,10 +371,7 @@ def run_scan() -> Tuple[str, str]:
             'recommendations': "Please check system configuration and try again."
         }
         
-        error_pdf = create_pdf_report(error_data)
-        error_json = create_json_report(error_data)
-        
-        return error_pdf, error_json
+        return create_reports(error_data, scan_time)
 
 # Create the Gradio interface
 def create_interface():
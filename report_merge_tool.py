@@ -8,37 +8,47 @@ recent or matching files, so the agent can answer requests like
 """
 from __future__ import annotations
 
-import json, uuid, shutil, datetime as dt, logging, re
+import os, asyncio, uuid, shutil, datetime as dt, logging, re, functools, fnmatch, string
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List, Dict, Iterable, Optional
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+from xml.sax.saxutils import escape
 
+import aiofiles
+import msgspec
+import orjson
 from agno.tools import tool            # ✅ Agno auto-registers the function
-from pydantic import BaseModel, Field, ValidationError
 
 # ---------------------------------------------------------------------------#
 #  Adjustable paths – keep together so they can be overridden via env var     #
 # ---------------------------------------------------------------------------#
 SCAN_DIR   = Path(__file__).with_name("scan_outputs")
 MERGE_ROOT = Path(__file__).with_name("merged_reports")
-TEMPLATE   = Path(__file__).with_name("report_template.md")   # for PDF build
+TEMPLATE   = Path(__file__).with_name("report_template.md")   # $placeholders, for PDF build
+IO_WORKERS = 8                          # threads for archiving scans
+READ_CONCURRENCY = 32                   # max scan files open at once
+
+_SINCE_RE = re.compile(r"(\d+)([dh])", re.IGNORECASE)   # relative '7d' / '24h'
+_DATE_ONLY_RE = re.compile(r"\d{4}-\d{2}-\d{2}")         # scanned_at like '2025-07-20'
 
 # ---------------------------------------------------------------------------#
-#  Pydantic models – give early validation & autocompletion                  #
+#  msgspec models – validated straight from bytes by a C decoder            #
 # ---------------------------------------------------------------------------#
-class Finding(BaseModel):
+class Finding(msgspec.Struct):
     id:        str
     severity:  str
     title:     str
     details:   str
 
-class Scan(BaseModel):
+class Scan(msgspec.Struct):
     scan_id:      str
     scanned_at:   dt.datetime
     target:       str
     findings:     List[Finding]
     tool:         Optional[str] = "unknown"
 
-class MergedReport(BaseModel):
+class MergedReport(msgspec.Struct):
     merged_report_id: str
     generated_at:     dt.datetime
     scan_count:       int
@@ -48,6 +58,10 @@ class MergedReport(BaseModel):
     severity_stats:   Dict[str, int]
     recommendations:  str
 
+# strict=False also accepts Unix timestamps for scanned_at
+_SCAN_DECODER  = msgspec.json.Decoder(Scan, strict=False)
+_REPORT_ENCODER = msgspec.json.Encoder()    # datetimes → RFC 3339 in C
+
 # ---------------------------------------------------------------------------#
 #  Public tool – the Agno-visible entry-point                                #
 # ---------------------------------------------------------------------------#
@@ -60,10 +74,14 @@ class MergedReport(BaseModel):
         "• include:  glob pattern or list of patterns (default **/*.json)\n"
         "• since:    ISO date or relative like '7d', '24h'\n"
         "• target:   regex that the scan['target'] must match\n"
-        "Example: '{\"include\":\"*.json\",\"since\":\"3d\"}'"
+        "• limit:    only merge the N most recently modified valid scans\n"
+        "Scan files need scan_id, scanned_at (RFC 3339, date, or Unix "
+        "timestamp), target and findings.\n"
+        "Example: '{\"include\":\"*.json\",\"since\":\"3d\"}'\n"
+        "Set batch=true to get one report per target, bundled in a single PDF."
     ),
 )
-def merge_scan_reports(config: str = "") -> str:
+def merge_scan_reports(config: str = "", batch: bool = False) -> str:
     """
     Combine selected scan JSON files into one consolidated report bundle.
 
@@ -74,10 +92,15 @@ def merge_scan_reports(config: str = "") -> str:
           include (str | List[str])  – glob(s) to include, default **/*.json
           since   (str)              – e.g. '2025-07-20T00:00Z', '48h', '7d'
           target  (str)              – regex to filter Scan.target
+          limit   (int)              – merge only the N newest (by mtime) scans
+                                       that validate and pass the target filter
+    batch : bool, optional
+        Build one MergedReport per scan target instead of a single report.
+        report.json then holds a list, and all reports share one PDF.
     """
     try:
-        cfg = json.loads(config or "{}")
-    except json.JSONDecodeError as e:
+        cfg = orjson.loads(config or "{}")
+    except orjson.JSONDecodeError as e:
         return f"❌ Invalid config JSON: {e}"
 
     # ------------------------------------------------------------------#
@@ -88,34 +111,46 @@ def merge_scan_reports(config: str = "") -> str:
         if isinstance(cfg.get("include"), list) else [cfg.get("include", "**/*.json")]
     )
     since_ts = _parse_since(cfg.get("since"))
-    target_re = re.compile(cfg["target"]) if cfg.get("target") else None
+    limit = cfg.get("limit")
+    if limit is not None and (not isinstance(limit, int) or isinstance(limit, bool) or limit < 1):
+        return f"❌ Invalid limit: {limit!r} (expected a positive integer)"
+    target_re = _compile_target(cfg["target"]) if cfg.get("target") else None
 
-    files = {
-        p for pattern in patterns
-        for p in SCAN_DIR.glob(pattern)
-        if p.is_file() and (since_ts is None or _mtime(p) >= since_ts)
+    # One directory walk, one stat per file – reused for the mtime filter
+    files: Dict[Path, os.stat_result] = {
+        path: st for path, rel, st in _walk_files(SCAN_DIR)
+        if any(_glob_match(rel, pattern) for pattern in patterns)
+        and (since_ts is None or _mtime(st) >= since_ts)
     }
 
     if not files:
         return "⚠️ No matching scan JSON files found."
 
-    scans: List[Scan] = []
-    errors: List[str] = []
-    for f in sorted(files):
-        try:
-            with open(f, encoding="utf-8") as fh:
-                raw = json.load(fh)
-            candidate = Scan.model_validate(raw)
-            if target_re and not target_re.search(candidate.target):
-                continue
-            scans.append(candidate)
-        except (json.JSONDecodeError, ValidationError) as exc:
-            errors.append(f"{f.name}: {exc}")
+    # With a limit, walk newest-first (mtimes reused from the walk) and stop
+    # once enough scans validate and pass the target filter
+    candidates: List[Path] = (
+        sorted(files, key=lambda p: files[p].st_mtime, reverse=True)
+        if limit else sorted(files)
+    )
+    examined, accepted, errors = _load_scans(candidates, target_re, limit)
+    # Merge in path order either way, so a limit covering every scan gives
+    # the same report (order and first-wins de-duplication) as no limit
+    scans = [accepted[p] for p in sorted(accepted)]
 
     if not scans:
-        return "⚠️ No scans survived validation / filters."
+        msg = ["⚠️ No scans survived validation / filters."]
+        if errors:
+            msg.append("\nThe following files had validation errors and were skipped:")
+            msg.extend(f"  • {e}" for e in errors)
+        return "\n".join(msg)
 
-    merged = _build_report(scans)
+    if batch:
+        by_target: Dict[str, List[Scan]] = {}
+        for scan in scans:
+            by_target.setdefault(scan.target, []).append(scan)
+        reports = [_build_report(group) for group in by_target.values()]
+    else:
+        reports = [_build_report(scans)]
 
     # ------------------------------------------------------------------#
     # Persist outputs                                                   #
@@ -125,22 +160,37 @@ def merge_scan_reports(config: str = "") -> str:
     target_dir.mkdir(parents=True, exist_ok=True)
 
     json_path = target_dir / "report.json"
-    json_path.write_text(json.dumps(merged.model_dump(), indent=2, ensure_ascii=False), encoding="utf-8")
-
-    # --- Build PDF from markdown template via Pandoc ------------------#
     pdf_path  = target_dir / "report.pdf"
-    _write_pdf(merged, pdf_path)
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        writes = [
+            pool.submit(json_path.write_bytes,
+                        msgspec.json.format(_REPORT_ENCODER.encode(reports if batch else reports[0]), indent=2)),
+            # --- Build PDF from markdown template via Pandoc ----------#
+            pool.submit(_write_pdf, reports, pdf_path),
+        ]
+    for write in writes:
+        write.result()                  # re-raise any failure
 
-    # Optionally archive the source scans alongside the bundle
-    for src in files:
-        shutil.copy2(src, target_dir / src.name)
+    # Optionally archive the source scans under sources/ (so a scan named
+    # report.json can't replace the bundle), mirroring their sub-folders so
+    # same-named scans from different folders don't collide
+    sources_dir = target_dir / "sources"
+    with ThreadPoolExecutor(max_workers=IO_WORKERS) as pool:
+        archived = [
+            pool.submit(_archive, src, sources_dir / src.relative_to(SCAN_DIR))
+            for src in sorted(examined)
+        ]
+    for done in archived:
+        done.result()
 
     msg = [
         "📝 **Merged report created!**",
         f"- JSON → {json_path}",
         f"- PDF  → {pdf_path}",
-        f"Total scans merged: {merged.scan_count}",
+        f"Total scans merged: {sum(r.scan_count for r in reports)}",
     ]
+    if batch:
+        msg.append(f"Per-target reports: {len(reports)}")
     if errors:
         msg.append("\nThe following files had validation errors and were skipped:")
         msg.extend(f"  • {e}" for e in errors)
@@ -154,7 +204,7 @@ def _parse_since(value: Optional[str]) -> Optional[dt.datetime]:
     if not value:
         return None
     now = dt.datetime.now(dt.timezone.utc)
-    if m := re.match(r"(?i)(\d+)([dh])", value.strip()):
+    if m := _SINCE_RE.match(value.strip()):
         qty, unit = int(m.group(1)), m.group(2).lower()
         delta = dt.timedelta(hours=qty) if unit == "h" else dt.timedelta(days=qty)
         return now - delta
@@ -166,16 +216,124 @@ def _parse_since(value: Optional[str]) -> Optional[dt.datetime]:
         logging.warning("Unrecognised 'since' value: %s", value)
         return None
 
-def _mtime(path: Path) -> dt.datetime:
-    return dt.datetime.fromtimestamp(path.stat().st_mtime, tz=dt.timezone.utc)
+@functools.lru_cache(maxsize=64)
+def _compile_target(pattern: str) -> re.Pattern[str]:
+    """Agents tend to repeat the same target filter – compile it once."""
+    return re.compile(pattern)
+
+def _load_scans(
+    candidates: List[Path], target_re: Optional[re.Pattern[str]], limit: Optional[int],
+) -> Tuple[List[Path], Dict[Path, Scan], List[str]]:
+    """
+    Decode candidates in order, keeping scans that match target_re.
+    Returns (files examined, accepted scans by path, validation errors);
+    stops after `limit` accepted scans, reading ahead one chunk at a time.
+    """
+    examined: List[Path] = []
+    accepted: Dict[Path, Scan] = {}
+    errors: List[str] = []
+    chunk = max(limit, READ_CONCURRENCY) if limit else max(len(candidates), 1)
+    for start in range(0, len(candidates), chunk):
+        paths = candidates[start:start + chunk]
+        for f, candidate in zip(paths, _run_sync(_gather_scans(paths))):
+            examined.append(f)
+            if isinstance(candidate, msgspec.DecodeError):   # also covers msgspec.ValidationError
+                errors.append(f"{f.name}: {candidate}")
+                continue
+            if isinstance(candidate, BaseException):
+                raise candidate
+            if target_re and not target_re.search(candidate.target):
+                continue
+            accepted[f] = candidate
+            if limit and len(accepted) == limit:
+                return examined, accepted, errors
+    return examined, accepted, errors
+
+def _decode_scan(data: bytes) -> Scan:
+    """
+    Decode one scan file. scanned_at may be RFC 3339, a Unix timestamp, or a
+    bare date (read as midnight, as the earlier Pydantic model did).
+    """
+    try:
+        return _SCAN_DECODER.decode(data)
+    except msgspec.ValidationError:
+        raw = msgspec.json.decode(data)
+        when = raw.get("scanned_at") if isinstance(raw, dict) else None
+        if not isinstance(when, str) or not _DATE_ONLY_RE.fullmatch(when):
+            raise
+        raw["scanned_at"] = f"{when}T00:00:00"
+        return msgspec.convert(raw, Scan, strict=False)
+
+async def _gather_scans(paths: List[Path]) -> List[Scan | BaseException]:
+    """Read + decode all scans concurrently; failures are returned, not raised."""
+    limiter = asyncio.Semaphore(READ_CONCURRENCY)
+
+    async def load(path: Path) -> Scan:
+        async with limiter:
+            async with aiofiles.open(path, "rb") as fh:
+                data = await fh.read()
+        return _decode_scan(data)
+
+    return await asyncio.gather(*(load(p) for p in paths), return_exceptions=True)
+
+def _run_sync(coro):
+    """asyncio.run() that also works when the agent calls us inside a running loop."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+def _walk_files(root: Path) -> Iterator[Tuple[Path, str, os.stat_result]]:
+    """Yield (path, posix path relative to root, stat) for every file below root."""
+    stack = [(root, "")]
+    while stack:
+        folder, prefix = stack.pop()
+        try:
+            entries = os.scandir(folder)
+        except OSError:
+            continue
+        with entries:
+            for entry in entries:
+                rel = prefix + entry.name
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append((Path(entry.path), rel + "/"))
+                elif entry.is_file():
+                    yield Path(entry.path), rel, entry.stat()
+
+def _glob_match(rel: str, pattern: str) -> bool:
+    """Path.glob-style match of a file's relative posix path against pattern."""
+    return _match_parts(tuple(rel.split("/")), _pattern_parts(pattern))
+
+@functools.lru_cache(maxsize=64)
+def _pattern_parts(pattern: str) -> Tuple[str, ...]:
+    return tuple(part for part in pattern.split("/") if part not in ("", "."))
+
+def _match_parts(parts: Tuple[str, ...], pats: Tuple[str, ...]) -> bool:
+    """Match segment by segment; '**' spans zero or more whole folders."""
+    if not pats:
+        return not parts
+    head, rest = pats[0], pats[1:]
+    if head == "**":
+        if not rest:
+            return False                # a trailing '**' only selects folders
+        return any(_match_parts(parts[i:], rest) for i in range(len(parts)))
+    return (
+        bool(parts)
+        and fnmatch.fnmatchcase(parts[0], head)   # '*' never crosses a '/'
+        and _match_parts(parts[1:], rest)
+    )
+
+def _mtime(st: os.stat_result) -> dt.datetime:
+    return dt.datetime.fromtimestamp(st.st_mtime, tz=dt.timezone.utc)
 
 def _build_report(scans: List[Scan]) -> MergedReport:
+    all_findings = [f for scan in scans for f in scan.findings]
+    severity_tally = Counter(f.severity for f in all_findings)
     unique_findings: Dict[str, Finding] = {}
-    severity_tally: Dict[str, int] = {}
-    for scan in scans:
-        for f in scan.findings:
-            unique_findings.setdefault(f.id.lower(), f)
-            severity_tally[f.severity] = severity_tally.get(f.severity, 0) + 1
+    for f in all_findings:                      # first occurrence wins
+        unique_findings.setdefault(f.id.lower(), f)
 
     return MergedReport(
         merged_report_id = str(uuid.uuid4()),
@@ -188,26 +346,79 @@ def _build_report(scans: List[Scan]) -> MergedReport:
         recommendations  = "Refer to ‘Recommendations’ per-finding inside the PDF.",
     )
 
-def _write_pdf(report: MergedReport, out_path: Path) -> None:
+def _write_pdf(reports: List[MergedReport], out_path: Path) -> None:
     """
     Render markdown template → PDF via Pandoc (or fallback to plain text PDF).
+    All reports go into one document (page break between them) so Pandoc is
+    spawned once per bundle, not once per report.
     create_pdf_report() from your original helper is still supported; use the
     markdown route if Pandoc is available for richer formatting.
     """
     try:
-        import pypandoc, tempfile
-        md = TEMPLATE.read_text(encoding="utf-8").format(**_template_vars(report))
-        with tempfile.NamedTemporaryFile(suffix=".md", delete=False) as tmp:
-            tmp.write(md.encode("utf-8"))
-            tmp.flush()
-            pypandoc.convert_file(tmp.name, "pdf", outputfile=str(out_path))
+        import pypandoc
+        md = _render_markdown(reports)
+        # Markdown goes to Pandoc directly – no intermediate .md file to leak
+        pypandoc.convert_text(md, to="pdf", format="md", outputfile=str(out_path),
+                              extra_args=["--pdf-engine=xelatex"])
     except Exception as e:  # noqa: BLE001
-        logging.warning("Pandoc failed (%s); falling back to create_pdf_report()", e)
+        logging.warning("Markdown → PDF via Pandoc failed (%s); falling back to create_pdf_report()", e)
         from app import create_pdf_report
-        out_path.write_bytes(Path(create_pdf_report(report.model_dump())).read_bytes())
+        out_path.write_bytes(Path(create_pdf_report(_fallback_sections(reports))).read_bytes())
+
+@functools.lru_cache(maxsize=1)
+def _get_template() -> string.Template:
+    """Read and parse the markdown template once per process."""
+    return string.Template(TEMPLATE.read_text(encoding="utf-8"))
+
+def _render_markdown(reports: List[MergedReport]) -> str:
+    """Fill the template once per report, joined by page breaks."""
+    template = _get_template()
+    values = [_template_vars(r) for r in reports]
+    # Pre-$ templates used {name}; Template would leave those in silently
+    legacy = [k for k in values[0] if f"{{{k}}}" in template.template]
+    if legacy:
+        raise ValueError(
+            f"{TEMPLATE.name} uses str.format placeholders "
+            f"({', '.join('{%s}' % k for k in legacy)}); write them as $name"
+        )
+    return "\n\\newpage\n".join(template.substitute(v) for v in values)
+
+def _fallback_sections(reports: List[MergedReport]) -> Dict[str, str]:
+    """Collapse reports into the summary/findings/recommendations text create_pdf_report() expects.
+
+    Values are XML-escaped: ReportLab parses Paragraph text as markup, and
+    finding titles routinely contain '<' / '&' (e.g. "XSS via <script>").
+    """
+    return {
+        "summary":         "<br/>".join(escape(r.summary) for r in reports),
+        "findings":        "<br/>".join(
+            escape(f"[{f.severity}] {f.id}: {f.title}") for r in reports for f in r.findings
+        ),
+        "recommendations": "<br/>".join(escape(rec) for rec in dict.fromkeys(r.recommendations for r in reports)),
+    }
+
+def _archive(src: Path, dst: Path) -> None:
+    """
+    Hard-link src into the bundle; copy (kernel-side sendfile) whenever the
+    link fails – cross-device, unsupported, link limit, permissions. The new
+    entry is built under a unique temp name (so a failed link never means
+    "already exists") and swapped in with os.replace, so an existing dst –
+    possibly a hard link to another scan – is replaced, never written through.
+    """
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    tmp = dst.with_name(f".{dst.name}.{uuid.uuid4().hex}.tmp")
+    try:
+        try:
+            os.link(src, tmp)
+        except OSError:
+            shutil.copyfile(src, tmp)
+        os.replace(tmp, dst)
+    finally:
+        # Also covers rename() being a no-op when tmp and dst share an inode
+        tmp.unlink(missing_ok=True)
 
 def _template_vars(r: MergedReport) -> Dict[str, str]:
-    """Flatten the model for Jinja-lite formatting inside the .md template."""
+    """Flatten the model for $placeholder substitution inside the .md template."""
     return {
         "merged_report_id": r.merged_report_id,
         "generated_at":     r.generated_at.isoformat(timespec="seconds"),
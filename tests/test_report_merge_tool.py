@@ -0,0 +1,194 @@
+import json
+import os
+import time
+
+import pytest
+
+import report_merge_tool as merge_tool
+
+TREE = [
+    "a.json",
+    "notes.txt",
+    "sub/b.json",
+    "sub/deep/c.json",
+    "other/sub/d.json",
+    "other/e.json",
+]
+
+PATTERNS = [
+    "*.json",
+    "**/*.json",
+    "*/*.json",
+    "sub/*.json",
+    "sub/**/*.json",
+    "**/sub/*.json",
+    "**/deep/*.json",
+    "sub/deep/c.json",
+    "**",
+    "sub/**",
+    "**/**/*.json",
+]
+
+
+@pytest.fixture
+def scan_tree(tmp_path):
+    for rel in TREE:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text("{}")
+    return tmp_path
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_glob_match_agrees_with_path_glob(scan_tree, pattern):
+    expected = {
+        p.relative_to(scan_tree).as_posix()
+        for p in scan_tree.glob(pattern)
+        if p.is_file()
+    }
+    matched = {
+        rel
+        for _, rel, _ in merge_tool._walk_files(scan_tree)
+        if merge_tool._glob_match(rel, pattern)
+    }
+    assert matched == expected
+
+
+@pytest.mark.parametrize(
+    "scanned_at, expected",
+    [
+        ('"2025-07-20T10:00:00Z"', "2025-07-20T10:00:00+00:00"),
+        ('"2025-07-20"', "2025-07-20T00:00:00"),
+        ("1753005600", "2025-07-20T10:00:00+00:00"),
+    ],
+)
+def test_decode_scan_accepts_pydantic_era_timestamps(scanned_at, expected):
+    data = (
+        '{"scan_id": "s1", "scanned_at": %s, "target": "host-A", "findings": []}'
+        % scanned_at
+    ).encode()
+    assert merge_tool._decode_scan(data).scanned_at.isoformat() == expected
+
+
+def _write_scan(path, scan_id, target="host-A", findings=()):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({
+        "scan_id": scan_id,
+        "scanned_at": "2025-07-30T10:00:00Z",
+        "target": target,
+        "findings": [
+            {"id": fid, "severity": "high", "title": f"{fid} in {scan_id}", "details": ""}
+            for fid in findings
+        ],
+    }))
+
+
+@pytest.fixture
+def merge_env(tmp_path, monkeypatch):
+    scan_dir, merge_root = tmp_path / "scan_outputs", tmp_path / "merged_reports"
+    scan_dir.mkdir()
+    monkeypatch.setattr(merge_tool, "SCAN_DIR", scan_dir)
+    monkeypatch.setattr(merge_tool, "MERGE_ROOT", merge_root)
+    # PDF rendering (Pandoc / ReportLab) is out of scope for these tests
+    monkeypatch.setattr(merge_tool, "_write_pdf", lambda reports, out: out.write_bytes(b"%PDF"))
+
+    def run(config=""):
+        message = merge_tool.merge_scan_reports.entrypoint(config)
+        bundles = sorted(merge_root.glob("merged_*"))
+        report = json.loads((bundles[-1] / "report.json").read_text()) if bundles else None
+        return message, report, (bundles[-1] if bundles else None)
+
+    return scan_dir, run
+
+
+def test_archive_replaces_existing_entry_instead_of_writing_through(tmp_path):
+    a, b, dst = tmp_path / "a.json", tmp_path / "b.json", tmp_path / "out" / "scan.json"
+    a.write_text("A")
+    b.write_text("B")
+
+    merge_tool._archive(a, dst)
+    merge_tool._archive(a, dst)     # dst is already a link to a (SameFileError before)
+    merge_tool._archive(b, dst)     # dst links to a; must not overwrite a's content
+
+    assert a.read_text() == "A"
+    assert b.read_text() == "B"
+    assert dst.read_text() == "B"
+    assert sorted(p.name for p in dst.parent.iterdir()) == ["scan.json"]
+
+
+def test_archived_sources_do_not_clobber_bundle_outputs(merge_env):
+    scan_dir, run = merge_env
+    _write_scan(scan_dir / "report.json", "top")
+    _write_scan(scan_dir / "a" / "scan.json", "a")
+    _write_scan(scan_dir / "b" / "scan.json", "b")
+
+    _, report, bundle = run()
+
+    assert "merged_report_id" in report
+    assert (bundle / "report.pdf").read_bytes() == b"%PDF"
+    assert json.loads((bundle / "sources" / "report.json").read_text())["scan_id"] == "top"
+    assert json.loads((bundle / "sources" / "a" / "scan.json").read_text())["scan_id"] == "a"
+    assert json.loads((bundle / "sources" / "b" / "scan.json").read_text())["scan_id"] == "b"
+    assert json.loads((scan_dir / "a" / "scan.json").read_text())["scan_id"] == "a"
+
+
+def _age(path, seconds_ago):
+    stamp = time.time() - seconds_ago
+    os.utime(path, (stamp, stamp))
+
+
+def test_limit_covering_every_scan_matches_unlimited_report(merge_env):
+    scan_dir, run = merge_env
+    _write_scan(scan_dir / "a.json", "a", findings=["F1"])
+    _write_scan(scan_dir / "b.json", "b", findings=["F1"])
+    _age(scan_dir / "a.json", 60)           # b is newer
+
+    _, unlimited, _ = run()
+    _, limited, _ = run('{"limit": 10}')
+
+    assert [s["scan_id"] for s in limited["scans"]] == ["a", "b"]
+    assert [s["scan_id"] for s in limited["scans"]] == [s["scan_id"] for s in unlimited["scans"]]
+    assert limited["findings"] == unlimited["findings"]
+    assert limited["findings"][0]["title"] == "F1 in a"
+
+
+def test_limit_counts_valid_scans_not_files(merge_env):
+    scan_dir, run = merge_env
+    _write_scan(scan_dir / "old1.json", "old1")
+    _write_scan(scan_dir / "old2.json", "old2", target="host-B")
+    _write_scan(scan_dir / "old3.json", "old3")
+    _write_scan(scan_dir / "oldest.json", "oldest")
+    (scan_dir / "bad1.json").write_text('{"report_id": "not a scan"}')
+    (scan_dir / "bad2.json").write_text("{nope")
+    for name, age in [("oldest", 400), ("old1", 300), ("old2", 200), ("old3", 100)]:
+        _age(scan_dir / f"{name}.json", age)
+
+    message, report, bundle = run('{"limit": 2, "target": "host-A"}')
+
+    assert [s["scan_id"] for s in report["scans"]] == ["old1", "old3"]
+    assert "bad1.json" in message and "bad2.json" in message
+    # The newest-first walk stops once two scans are accepted
+    assert (bundle / "sources" / "old1.json").exists()
+    assert not (bundle / "sources" / "oldest.json").exists()
+
+
+def test_limit_reports_errors_when_nothing_validates(merge_env):
+    scan_dir, run = merge_env
+    (scan_dir / "bad.json").write_text("{nope")
+
+    message, report, _ = run('{"limit": 1}')
+
+    assert report is None
+    assert message.startswith("⚠️ No scans survived")
+    assert "bad.json" in message
+
+
+@pytest.mark.parametrize("limit", ["true", "false", "0", "-1", '"3"', "1.5"])
+def test_invalid_limit_is_rejected(merge_env, limit):
+    scan_dir, run = merge_env
+    _write_scan(scan_dir / "a.json", "a")
+
+    message, report, _ = run('{"limit": %s}' % limit)
+
+    assert message.startswith("❌ Invalid limit")
+    assert report is None